@@ -9,12 +9,49 @@ Projeto: P01 - Processo de Análise de Séries Temporais
 
 from __future__ import annotations
 
+from functools import cache
 from typing import Optional, Tuple
 
-import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
-from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
-from statsmodels.tsa.seasonal import seasonal_decompose
+from utils_timeseries import clean_values
+
+# matplotlib, statsmodels e numba são importados dentro das funções que os usam:
+# importar este módulo não paga o custo de carregá-los até o primeiro gráfico
+
+# acima disso os gráficos de linha são reduzidos (o Agg não mostra mais detalhe que isso)
+MAX_PLOT_POINTS = 20_000
+
+
+def _downsample(serie: pd.Series, max_points: int | None = MAX_PLOT_POINTS) -> pd.Series:
+    """
+    Reduz a série para no máximo ~max_points pontos, só para exibição.
+
+    A série é dividida em blocos consecutivos e cada bloco mantém o seu mínimo e
+    o seu máximo (envelope), preservando picos e vales que uma amostragem por
+    passo simples perderia. Com max_points=None, ou se a série não for numérica,
+    ela é devolvida intacta.
+    """
+    n = len(serie)
+    if max_points is None or n <= max_points or not pd.api.types.is_numeric_dtype(serie):
+        # séries não numéricas (texto, categorias) não têm mín/máx para o envelope
+        return serie
+
+    # 2 pontos (mín/máx) por bloco
+    stride = int(np.ceil(n / max(max_points // 2, 1)))
+    n_blocks = int(np.ceil(n / stride))
+
+    values = np.full(n_blocks * stride, np.nan)
+    values[:n] = serie.to_numpy(dtype=np.float64)
+    blocks = values.reshape(n_blocks, stride)
+    nan_mask = np.isnan(blocks)
+
+    offsets = np.arange(n_blocks) * stride
+    idx_min = np.where(nan_mask, np.inf, blocks).argmin(axis=1) + offsets
+    idx_max = np.where(nan_mask, -np.inf, blocks).argmax(axis=1) + offsets
+
+    idx = np.unique(np.concatenate([idx_min, idx_max]))
+    return serie.iloc[idx[idx < n]]
 
 
 def plot_series(
@@ -24,6 +61,7 @@ def plot_series(
     ylabel: str = "Valor",
     figsize: tuple[int, int] = (12, 4),
     grid: bool = True,
+    max_points: int | None = MAX_PLOT_POINTS,
 ) -> None:
     """
     Plota uma série temporal simples.
@@ -40,7 +78,14 @@ def plot_series(
         Tamanho da figura em polegadas.
     grid : bool, default True
         Se True, exibe grid no gráfico.
+    max_points : int, default 20000
+        Séries maiores são reduzidas (envelope mín/máx) antes de plotar.
+        Use None para plotar todos os pontos.
     """
+    import matplotlib.pyplot as plt
+
+    serie = _downsample(serie, max_points)
+
     fig, ax = plt.subplots(figsize=figsize)
     ax.plot(serie.index, serie.values)
     ax.set_title(title)
@@ -73,19 +118,115 @@ def plot_decomposition(
     figsize : tuple, default (12, 8)
         Tamanho da figura.
     """
-    decomposition = seasonal_decompose(serie.dropna(), model=model, period=freq)
+    import matplotlib.pyplot as plt
+    from statsmodels.tsa.seasonal import seasonal_decompose
 
-    fig = decomposition.plot()
-    fig.set_size_inches(figsize[0], figsize[1])
-    fig.tight_layout()
+    values, index = clean_values(serie)
+    decomposition = seasonal_decompose(
+        pd.Series(values, index=index, name=serie.name), model=model, period=freq
+    )
+
+    # figura criada já no tamanho final: o plot() do statsmodels faz um único
+    # tight_layout, sem redimensionar e refazer o layout depois
+    with plt.rc_context({"figure.figsize": figsize}):
+        decomposition.plot()
     plt.show()
 
 
+# re-ancoragem do kernel móvel: quando o quadrado médio de (x - ref) passa de
+# _REANCHOR_RATIO vezes a variância, a subtração das somas perderia dígitos
+_REANCHOR_RATIO = 1e6
+# abaixo desta escala relativa a ref a janela é constante na precisão do float
+_REANCHOR_MIN_SCALE = 1e-26
+
+
+def _rolling_mean_std_kernel(x: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Média e desvio padrão móveis (ddof=1) calculados juntos, em O(n).
+
+    As somas de (x - ref) e (x - ref)² deslizam com a janela, com ref perto da
+    média da janela. Elas são recalculadas do zero (ref passa a ser a média da
+    janela atual) a cada 'window' passos, o que limita o erro acumulado, e
+    também quando a variância fica pequena frente a essas somas (ex.: logo
+    após uma mudança brusca de nível). Janelas com NaN geram NaN, como no pandas.
+    """
+    n = x.shape[0]
+    mean_out = np.full(n, np.nan)
+    std_out = np.full(n, np.nan)
+    ref = 0.0
+    s1 = 0.0
+    s2 = 0.0
+    m2 = 0.0
+    age = window  # passos desde a última ancoragem (>= window: recalcula)
+    last_nan = -1
+    for i in range(n):
+        if np.isnan(x[i]):
+            last_nan = i
+        start = i - window + 1
+        if start < 0 or last_nan >= start:
+            age = window
+            continue
+
+        if age < window:
+            # janela anterior válida: entra x[i] e sai x[start - 1]
+            d_in = x[i] - ref
+            d_out = x[start - 1] - ref
+            s1 += d_in - d_out
+            s2 += d_in * d_in - d_out * d_out
+            m2 = s2 - s1 * s1 / window
+            age += 1
+            if m2 * _REANCHOR_RATIO < s2 and s2 > _REANCHOR_MIN_SCALE * window * ref * ref:
+                age = window
+
+        if age >= window:
+            total = 0.0
+            for j in range(start, i + 1):
+                total += x[j]
+            ref = total / window
+            s1 = 0.0
+            s2 = 0.0
+            for j in range(start, i + 1):
+                d = x[j] - ref
+                s1 += d
+                s2 += d * d
+            m2 = s2 - s1 * s1 / window
+            age = 0
+
+        mean_out[i] = ref + s1 / window
+        if window > 1:
+            std_out[i] = np.sqrt(max(m2, 0.0) / (window - 1))
+    return mean_out, std_out
+
+
+@cache
+def _rolling_mean_std_numba():
+    """Kernel numba de _rolling_mean_std_kernel, compilado no 1º uso (None sem numba)."""
+    try:  # numba é opcional: calcula média e desvio móveis juntos
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(cache=True)(_rolling_mean_std_kernel)
+
+
+def _rolling_mean_std(serie: pd.Series, window: int) -> tuple[pd.Series, pd.Series]:
+    """Média e desvio padrão móveis; usa o kernel numba quando disponível."""
+    kernel = _rolling_mean_std_numba() if window >= 1 else None
+    if kernel is None:
+        return serie.rolling(window=window).mean(), serie.rolling(window=window).std()
+
+    mean, std = kernel(serie.to_numpy(dtype=np.float64), window)
+    return (
+        pd.Series(mean, index=serie.index, name=serie.name),
+        pd.Series(std, index=serie.index, name=serie.name),
+    )
+
+
 def plot_rolling_statistics(
     serie: pd.Series,
     window: int = 12,
     title: str = "Rolling Mean & Rolling Std",
     figsize: tuple[int, int] = (12, 4),
+    max_points: int | None = MAX_PLOT_POINTS,
 ) -> None:
     """
     Plota série original, média móvel e desvio padrão móvel.
@@ -100,14 +241,22 @@ def plot_rolling_statistics(
         Título do gráfico.
     figsize : tuple, default (12, 4)
         Tamanho da figura.
+    max_points : int, default 20000
+        As estatísticas são calculadas na série completa; só as linhas
+        plotadas são reduzidas (envelope mín/máx). Use None para desligar.
     """
-    rolmean = serie.rolling(window=window).mean()
-    rolstd = serie.rolling(window=window).std()
+    import matplotlib.pyplot as plt
+
+    rolmean, rolstd = _rolling_mean_std(serie, window)
 
     fig, ax = plt.subplots(figsize=figsize)
-    ax.plot(serie, label="Série original")
-    ax.plot(rolmean, label=f"Média móvel ({window})", linestyle="--")
-    ax.plot(rolstd, label=f"Desvio padrão móvel ({window})", linestyle=":")
+    ax.plot(_downsample(serie, max_points), label="Série original")
+    ax.plot(_downsample(rolmean, max_points), label=f"Média móvel ({window})", linestyle="--")
+    ax.plot(
+        _downsample(rolstd, max_points),
+        label=f"Desvio padrão móvel ({window})",
+        linestyle=":",
+    )
     ax.set_title(title)
     ax.set_xlabel("Tempo")
     ax.set_ylabel("Valor")
@@ -134,12 +283,18 @@ def plot_acf_pacf_side_by_side(
     figsize : tuple, default (12, 4)
         Tamanho da figura.
     """
+    import matplotlib.pyplot as plt
+    from statsmodels.graphics.tsaplots import plot_acf, plot_pacf
+
+    # remove NaNs uma única vez e reaproveita o mesmo array nos dois gráficos
+    values, _ = clean_values(serie)
+
     fig, axes = plt.subplots(1, 2, figsize=figsize)
 
-    plot_acf(serie.dropna(), lags=lags, ax=axes[0])
+    plot_acf(values, lags=lags, ax=axes[0])
     axes[0].set_title("Função de Autocorrelação (ACF)")
 
-    plot_pacf(serie.dropna(), lags=lags, ax=axes[1], method="ywm")
+    plot_pacf(values, lags=lags, ax=axes[1], method="ywm")
     axes[1].set_title("Função de Autocorrelação Parcial (PACF)")
 
     fig.tight_layout()
@@ -10,13 +10,28 @@ Projeto: P01 - Processo de Análise de Séries Temporais
 
 from __future__ import annotations
 
+from functools import cache
 from pathlib import Path
 from typing import Any
 
 import numpy as np
 import pandas as pd
-from scipy import stats
-from statsmodels.tsa.stattools import adfuller
+
+# scipy/statsmodels/numba são importados só nas funções que os usam (adfuller,
+# boxcox, diferenciação longa), para que carregar/preparar séries não pague o
+# custo de importá-los
+
+try:  # bottleneck é opcional: ffill/bfill em C direto no ndarray
+    import bottleneck as bn
+except ImportError:
+    bn = None
+
+# a partir deste tamanho a diferenciação de ordem >= 2 usa o kernel numba
+# (se instalado, extra 'perf'); a de ordem 1 é mais rápida com np.subtract
+_NUMBA_MIN_LEN = 50_000
+
+# resolução das datas lidas pelo pandas instalado (us no pandas 3, ns no 2.x)
+_DATE_UNIT = pd.to_datetime(["2000-01-01"]).unit
 
 
 def load_timeseries(
@@ -31,12 +46,27 @@ def load_timeseries(
     dropna: bool = True,
     sort_index: bool = True,
     index_name: str = "data",
+    dtypes: dict[str, Any] | None = None,
+    chunksize: int | None = None,
+    dtype_backend: str | None = None,
+    memory_map: bool = False,
 ) -> pd.Series:
     """
     Carrega um CSV simples (com ou sem cabeçalho) e retorna uma pd.Series indexada por data.
 
     - Aceita date_col/value_col como índice (int) ou nome (str).
     - Se has_header=False, lê com header=None e renomeia para column_names (obrigatório nesse caso).
+    - Se has_header=True e as colunas forem nomes, lê só as 2 colunas já tipadas
+      (engine pyarrow quando disponível, também com chunksize); 'dtypes' sobrescreve
+      os tipos padrão. 'dtypes' só vale nesse caso: é ignorado com colunas por posição
+      ou has_header=False. Erros causados por 'dtypes' (tipo inválido, valor
+      incompatível) são propagados.
+    - Se chunksize for informado, lê o arquivo em blocos (para CSVs maiores que a RAM),
+      mantendo só data/valor de cada bloco antes de concatenar.
+    - dtype_backend='pyarrow' devolve a série com valores Arrow (requer pyarrow);
+      o índice continua sendo um DatetimeIndex.
+    - memory_map=True mapeia o arquivo em memória (útil ao reler o mesmo CSV várias
+      vezes, pois o cache de páginas do SO é aproveitado sem cópia extra).
     """
 
     filepath = Path(filepath)
@@ -46,48 +76,78 @@ def load_timeseries(
     # ------------------------------
     # Leitura do CSV (com/sem header)
     # ------------------------------
-    if has_header:
-        df = pd.read_csv(filepath)
-    else:
-        if not column_names or len(column_names) != 2:
-            raise ValueError(
-                "Para has_header=False, informe column_names com 2 nomes, ex: ('data','usuarios_ativos')."
+    if not has_header and (not column_names or len(column_names) != 2):
+        raise ValueError(
+            "Para has_header=False, informe column_names com 2 nomes, ex: ('data','usuarios_ativos')."
+        )
+
+    read_kwargs: dict[str, Any] = {}
+    if dtype_backend is not None:
+        read_kwargs["dtype_backend"] = dtype_backend
+    if memory_map:
+        read_kwargs["memory_map"] = True
+
+    # colunas por nome e com cabeçalho: leitura tipada (o valor sai como float)
+    typed = has_header and isinstance(date_col, str) and isinstance(value_col, str)
+
+    if chunksize is not None:
+        df = _read_csv_chunked(
+            filepath,
+            date_col,
+            value_col,
+            chunksize,
+            has_header=has_header,
+            column_names=column_names,
+            date_format=date_format,
+            dropna=dropna,
+            dtypes=dtypes,
+            **read_kwargs,
+        )
+        # o leitor em blocos já devolve apenas [data, valor], nessa ordem
+        date_col, value_col = 0, 1
+    elif has_header:
+        df = None
+        if typed:
+            df = _read_csv_typed(
+                filepath, date_col, value_col, date_format, dtypes, **read_kwargs
             )
-        df = pd.read_csv(filepath, header=None)
+        if df is None:
+            df = pd.read_csv(filepath, **read_kwargs)
+    else:
+        df = pd.read_csv(filepath, header=None, **read_kwargs)
         df = df.rename(columns={0: column_names[0], 1: column_names[1]})
 
     # ------------------------------
     # Resolver colunas por índice/nome
     # ------------------------------
-    def _resolve_col(col: int | str) -> str:
-        if isinstance(col, int):
-            # converte posição -> nome real da coluna
-            try:
-                return df.columns[col]
-            except Exception as e:
-                raise KeyError(f"Coluna na posição {col} não existe. Colunas: {list(df.columns)}") from e
-        # string
-        if col not in df.columns:
-            raise KeyError(f"Coluna '{col}' não existe. Colunas: {list(df.columns)}")
-        return col
-
-    date_col_name = _resolve_col(date_col)
-    value_col_name = _resolve_col(value_col)
+    date_col_name = _resolve_col(df.columns, date_col)
+    value_col_name = _resolve_col(df.columns, value_col)
 
     # ------------------------------
-    # Tipagem/conversão
+    # Tipagem/conversão (só se a leitura não trouxe os tipos certos)
     # ------------------------------
-    if date_format is not None:
-        df[date_col_name] = pd.to_datetime(df[date_col_name], format=date_format, errors="coerce")
-    else:
-        df[date_col_name] = pd.to_datetime(df[date_col_name], errors="coerce")
+    if not pd.api.types.is_datetime64_any_dtype(df[date_col_name]):
+        if date_format is not None:
+            df[date_col_name] = pd.to_datetime(df[date_col_name], format=date_format, errors="coerce")
+        else:
+            df[date_col_name] = pd.to_datetime(df[date_col_name], errors="coerce")
 
-    df[value_col_name] = pd.to_numeric(df[value_col_name], errors="coerce")
+    if not pd.api.types.is_numeric_dtype(df[value_col_name]):
+        df[value_col_name] = _to_numeric(df[value_col_name], read_kwargs)
+    if typed:
+        # mesmo tipo de valor quando a leitura tipada cai para a genérica (ex.: célula inválida)
+        value_dtype = _typed_dtype(value_col_name, dtypes, read_kwargs)[value_col_name]
+        if df[value_col_name].dtype != value_dtype:
+            df[value_col_name] = df[value_col_name].astype(value_dtype)
 
     # ------------------------------
     # Montar série
     # ------------------------------
     ts = df.set_index(date_col_name)[value_col_name]
+    if not isinstance(ts.index, pd.DatetimeIndex):
+        # datas Arrow (dtype_backend='pyarrow') viram DatetimeIndex para asfreq/resample,
+        # na mesma resolução das datas lidas pelo engine C (o Arrow pode trazer segundos)
+        ts.index = _as_default_unit(pd.DatetimeIndex(ts.index))
     ts.index.name = index_name
 
     if dropna:
@@ -103,6 +163,195 @@ def load_timeseries(
     return ts
 
 
+def _to_numeric(values: pd.Series, read_kwargs: dict[str, Any]) -> pd.Series:
+    """
+    pd.to_numeric(errors='coerce') no dtype_backend da leitura.
+
+    Textos inválidos viram NA (e não NaN), para o dropna removê-los. No backend
+    Arrow a conversão é feita em NumPy e só depois passada para Arrow (onde NaN
+    vira nulo): o dtype_backend do próprio to_numeric falha em colunas Arrow com
+    nulos e textos inválidos ao mesmo tempo.
+    """
+    dtype_backend = read_kwargs.get("dtype_backend")
+    if dtype_backend == "pyarrow":
+        numeric = pd.to_numeric(values.to_numpy(dtype=object, na_value=np.nan), errors="coerce")
+        return pd.Series(numeric, index=values.index, name=values.name).astype(
+            f"{numeric.dtype}[pyarrow]"
+        )
+    if dtype_backend is not None:
+        return pd.to_numeric(values, errors="coerce", dtype_backend=dtype_backend)
+    return pd.to_numeric(values, errors="coerce")
+
+
+def _resolve_col(columns: pd.Index, col: int | str) -> str:
+    """Converte uma coluna dada por posição (int) ou nome (str) no nome real."""
+    if isinstance(col, int):
+        # converte posição -> nome real da coluna (checagem explícita, sem try/except)
+        n = len(columns)
+        if not -n <= col < n:
+            raise KeyError(f"Coluna na posição {col} não existe. Colunas: {list(columns)}")
+        return columns[col]
+    # string
+    if col not in columns:
+        raise KeyError(f"Coluna '{col}' não existe. Colunas: {list(columns)}")
+    return col
+
+
+def _read_csv_chunked(
+    filepath: Path,
+    date_col: int | str,
+    value_col: int | str,
+    chunksize: int,
+    *,
+    has_header: bool,
+    column_names: tuple[str, str] | None,
+    date_format: str | None,
+    dropna: bool,
+    dtypes: dict[str, Any] | None = None,
+    **read_kwargs: Any,
+) -> pd.DataFrame:
+    """
+    Lê o CSV em blocos de 'chunksize' linhas e devolve só as colunas [data, valor].
+
+    Cada bloco é reduzido às 2 colunas (com o valor já numérico, e sem as linhas
+    sem valor se dropna=True) antes do concat, então o pico de memória fica em um
+    bloco + o resultado final. O valor é lido sem tipo e convertido bloco a bloco:
+    uma célula inválida vira nulo, sem reler o arquivo. 'dtypes' é repassado ao
+    parser (erros causados por ele são propagados).
+    """
+    kwargs: dict[str, Any] = {"chunksize": chunksize, **read_kwargs}
+    if not has_header:
+        kwargs["header"] = None
+    elif isinstance(date_col, str) and isinstance(value_col, str):
+        kwargs["usecols"] = [date_col, value_col]
+        kwargs["parse_dates"] = [date_col]
+        if dtypes:
+            kwargs["dtype"] = dtypes
+        if date_format is not None:
+            kwargs["date_format"] = date_format
+
+    chunks = []
+    with pd.read_csv(filepath, **kwargs) as reader:
+        for chunk in reader:
+            if not has_header:
+                chunk = chunk.rename(columns={0: column_names[0], 1: column_names[1]})
+            date_name = _resolve_col(chunk.columns, date_col)
+            value_name = _resolve_col(chunk.columns, value_col)
+            chunk = chunk[[date_name, value_name]]
+            if not pd.api.types.is_numeric_dtype(chunk[value_name]):
+                chunk = chunk.assign(**{value_name: _to_numeric(chunk[value_name], read_kwargs)})
+            if dropna:
+                chunk = chunk.dropna(subset=[value_name])
+            chunks.append(chunk)
+
+    return pd.concat(chunks)
+
+
+def _typed_dtype(
+    value_col: str,
+    dtypes: dict[str, Any] | None,
+    read_kwargs: dict[str, Any],
+) -> dict[str, Any]:
+    """Tipos da leitura tipada: valor em float (Arrow ou NumPy) + 'dtypes' do usuário."""
+    if read_kwargs.get("dtype_backend") == "pyarrow":
+        dtype: dict[str, Any] = {value_col: "double[pyarrow]"}
+    else:
+        dtype = {value_col: "float64"}
+    if dtypes:
+        dtype.update(dtypes)
+    return dtype
+
+
+def _read_csv_typed(
+    filepath: Path,
+    date_col: str,
+    value_col: str,
+    date_format: str | None,
+    dtypes: dict[str, Any] | None,
+    **read_kwargs: Any,
+) -> pd.DataFrame | None:
+    """
+    Lê apenas as colunas de data e valor, já tipadas no parser.
+
+    Tenta a engine pyarrow e cai para a engine padrão se ela não estiver
+    instalada. As datas saem como na engine padrão (mesma resolução e mesmo
+    fuso do arquivo). Sem 'dtypes', retorna None se a leitura tipada falhar
+    (coluna inexistente, valor não numérico etc.), para o chamador usar a
+    leitura genérica. Com 'dtypes', o erro é do usuário e é propagado.
+    """
+    kwargs: dict[str, Any] = {
+        "usecols": [date_col, value_col],
+        "dtype": _typed_dtype(value_col, dtypes, read_kwargs),
+        "parse_dates": [date_col],
+        **read_kwargs,
+    }
+    if date_format is not None:
+        kwargs["date_format"] = date_format
+
+    try:
+        if read_kwargs.get("memory_map"):
+            # a engine pyarrow não aceita memory_map: usa a engine padrão
+            return pd.read_csv(filepath, **kwargs)
+        try:
+            df = pd.read_csv(filepath, engine="pyarrow", **kwargs)
+        except ImportError:
+            if "dtype_backend" in read_kwargs:
+                raise
+            return pd.read_csv(filepath, **kwargs)
+        if df[date_col].dtype.kind != "M":
+            # datas que o parser não reconheceu: o chamador converte com to_datetime
+            return df
+        dates = pd.DatetimeIndex(df[date_col])
+        if dates.tz is not None:
+            # o Arrow converte datas com fuso para UTC e perde o offset do arquivo:
+            # relê com a engine padrão, que o preserva
+            return pd.read_csv(filepath, **kwargs)
+        df[date_col] = _as_default_unit(dates)
+        return df
+    except (KeyError, ValueError, TypeError):
+        if dtypes:
+            raise
+        return None
+
+
+def _as_default_unit(dates: pd.DatetimeIndex) -> pd.DatetimeIndex:
+    """
+    Datas na resolução que a engine padrão usaria para o mesmo texto.
+
+    O Arrow lê datas em segundos (ou ns, se houver frações); o pandas usa a sua
+    resolução padrão e só passa a ns se alguma data tiver fração menor que 1 µs.
+    """
+    unit = _DATE_UNIT
+    if dates.unit == "ns" and (dates.asi8[~dates.isna()] % 1000).any():
+        unit = "ns"
+    return dates.as_unit(unit)
+
+
+# ---------------------------------------------------------------------------
+
+def clean_values(serie: pd.Series) -> tuple[np.ndarray, pd.Index]:
+    """
+    Retorna os valores float64 sem NaN e o índice correspondente.
+
+    Uma única máscara e um único gather (nenhum, se não houver NaN), no lugar de
+    serie.dropna() em cada função que precisa da série limpa.
+
+    Parâmetros
+    ----------
+    serie : pd.Series
+        Série numérica.
+
+    Retorno
+    -------
+    tuple[np.ndarray, pd.Index]
+        (valores, índice) sem as posições com NaN.
+    """
+    values = serie.to_numpy(dtype=np.float64)
+    mask = ~np.isnan(values)
+    if mask.all():
+        return values, serie.index
+    return values[mask], serie.index[mask]
+
 # ---------------------------------------------------------------------------
 
 def ensure_datetime_index(
@@ -132,7 +381,7 @@ def ensure_datetime_index(
     """
     # Se o índice já for datetime, apenas ajusta
     if not np.issubdtype(serie.index.dtype, np.datetime64):
-        serie.index = pd.to_datetime(serie.index, infer_datetime_format=True)
+        serie.index = pd.to_datetime(serie.index, cache=True)
 
     if sort_index:
         serie = serie.sort_index()
@@ -174,6 +423,13 @@ def fill_missing(
     pd.Series
         Série com valores faltantes preenchidos.
     """
+    if method in ("ffill", "bfill") and serie.dtype == object:
+        # série numérica guardada como object cai no caminho lento (elemento a elemento);
+        # converte para numérico só se nenhum valor não nulo se perder na conversão
+        numeric = pd.to_numeric(serie, errors="coerce")
+        if numeric.count() == serie.count():
+            serie = numeric
+
     if method == "ffill":
         return serie.ffill()
     elif method == "bfill":
@@ -191,8 +447,97 @@ def fill_missing(
     else:
         raise ValueError(f"Método de preenchimento não suportado: {method}")
 
+
+def _center_arr(x: np.ndarray, method: str) -> float:
+    """Média ou mediana de um array sem NaN (NaN se o array estiver vazio)."""
+    if x.size == 0:
+        return np.nan
+    return x.mean() if method == "mean" else np.median(x)
+
+
+def _fill_arr(x: np.ndarray, method: str = "ffill", value: float | None = None) -> np.ndarray:
+    """
+    Versão ndarray (float64) de fill_missing; devolve um novo array.
+
+    Mesmos métodos e erros de fill_missing, para encadear etapas sem recriar Series.
+    fill_missing não passa por aqui: para uma Series, os métodos do pandas são
+    mais rápidos que o ndarray + a Series recriada no final.
+    """
+    if method == "ffill" and bn is not None:
+        return bn.push(x)
+
+    mask = np.isnan(x)
+    if method == "ffill":
+        # posição do último valor válido até cada ponto (NaNs iniciais continuam NaN)
+        idx = np.where(mask, 0, np.arange(x.shape[0]))
+        np.maximum.accumulate(idx, out=idx)
+        return x[idx]
+    elif method == "bfill":
+        return _fill_arr(x[::-1], "ffill")[::-1]
+    elif method in ("mean", "median"):
+        fill = _center_arr(x[~mask], method)
+    elif method == "zero":
+        fill = 0.0
+    elif method == "value":
+        if value is None:
+            raise ValueError("Para method='value', é necessário informar 'value'.")
+        fill = value
+    else:
+        raise ValueError(f"Método de preenchimento não suportado: {method}")
+
+    out = x.copy()
+    out[mask] = fill
+    return out
+
 # ----------------------------------------------------------------------------------------
 
+def _diff_inplace(x: np.ndarray, order: int) -> np.ndarray:
+    """
+    Diferença de ordem k feita no próprio array (sem alocações temporárias).
+
+    Percorre o array de trás para frente, então x[i - 1] ainda é o valor da
+    passada anterior quando x[i] é atualizado. As k primeiras posições viram NaN.
+    """
+    n = x.shape[0]
+    for _ in range(order):
+        for i in range(n - 1, 0, -1):
+            x[i] -= x[i - 1]
+    x[: min(order, n)] = np.nan
+    return x
+
+
+@cache
+def _diff_numba():
+    """Kernel numba de _diff_inplace, compilado no 1º uso (None sem numba instalado)."""
+    try:  # numba é opcional: acelera a diferenciação de séries longas
+        from numba import njit
+    except ImportError:
+        return None
+    return njit(cache=True)(_diff_inplace)
+
+
+def _difference_arr(x: np.ndarray, order: int = 1) -> np.ndarray:
+    """
+    Versão ndarray de difference_series: diferença de ordem k de x (float64).
+
+    Devolve um novo array do mesmo tamanho, com as k primeiras posições NaN;
+    x não é alterado.
+    """
+    kernel = _diff_numba() if order >= 2 and x.shape[0] > _NUMBA_MIN_LEN else None
+    if kernel is not None:
+        # o kernel altera o array: trabalha numa cópia
+        return kernel(x.copy(), order)
+
+    out = np.empty(x.shape)
+    out[:order] = np.nan
+    if order == 1:
+        # caso mais comum: subtrai direto no array de saída, sem temporário do np.diff
+        np.subtract(x[1:], x[:-1], out=out[1:])
+    else:
+        out[order:] = np.diff(x, n=order)
+    return out
+
+
 def difference_series(
     serie: pd.Series,
     order: int = 1,
@@ -215,9 +560,15 @@ def difference_series(
     pd.Series
         Série diferenciada.
     """
-    diff = serie.copy()
-    for _ in range(order):
-        diff = diff.diff()
+    if order < 0:
+        raise ValueError(f"A ordem da diferenciação deve ser >= 0 (recebido: {order}).")
+
+    # as k primeiras posições ficam NaN, como no encadeamento de .diff()
+    diff = pd.Series(
+        _difference_arr(serie.to_numpy(dtype=np.float64), order),
+        index=serie.index,
+        name=serie.name,
+    )
 
     if dropna:
         diff = diff.dropna()
@@ -229,8 +580,9 @@ def difference_series(
 def adfuller_test(
     serie: pd.Series,
     alpha: float = 0.05,
-    autolag: str = "AIC",
+    autolag: str | None = "AIC",
     verbose: bool = False,
+    maxlag: int | None = None,
 ) -> dict[str, Any]:
     """
     Executa o teste ADF (Dickey-Fuller Aumentado) e retorna
@@ -246,6 +598,10 @@ def adfuller_test(
         Critério de seleção de defasagem usado pelo statsmodels.adfuller.
     verbose : bool, default False
         Se True, imprime um resumo amigável na tela.
+    maxlag : int, opcional
+        Defasagem já conhecida. Se informada, o teste usa exatamente esse lag
+        (autolag=None) e pula a busca, que ajusta uma regressão para cada lag
+        candidato e domina o custo em séries longas.
 
     Retorno
     -------
@@ -260,22 +616,16 @@ def adfuller_test(
             'alpha': float
         }
     """
-    serie_clean = serie.dropna()
+    # o adfuller trabalha com ndarray: remove NaNs direto no array, sem recriar a Series
+    values, _ = clean_values(serie)
+    output = _adfuller_arr(values, alpha, autolag, maxlag)
 
-    result = adfuller(serie_clean, autolag=autolag)
-    test_statistic, p_value, used_lag, n_obs, critical_values, _ = result
-
-    is_stationary = p_value < alpha
-
-    output = {
-        "test_statistic": test_statistic,
-        "p_value": p_value,
-        "used_lag": used_lag,
-        "n_obs": n_obs,
-        "critical_values": critical_values,
-        "is_stationary": is_stationary,
-        "alpha": alpha,
-    }
+    test_statistic = output["test_statistic"]
+    p_value = output["p_value"]
+    used_lag = output["used_lag"]
+    n_obs = output["n_obs"]
+    critical_values = output["critical_values"]
+    is_stationary = output["is_stationary"]
 
     if verbose:
         print("=== Teste Dickey-Fuller Aumentado (ADF) ===")
@@ -296,6 +646,33 @@ def adfuller_test(
 
     return output
 
+
+def _adfuller_arr(
+    x: np.ndarray,
+    alpha: float = 0.05,
+    autolag: str | None = "AIC",
+    maxlag: int | None = None,
+) -> dict[str, Any]:
+    """Versão ndarray de adfuller_test (x sem NaN); devolve o mesmo dicionário."""
+    from statsmodels.tsa.stattools import adfuller
+
+    if maxlag is not None:
+        result = adfuller(x, maxlag=maxlag, autolag=None)
+    else:
+        result = adfuller(x, autolag=autolag)
+    # com autolag=None o statsmodels não devolve o 6º item (icbest)
+    test_statistic, p_value, used_lag, n_obs, critical_values = result[:5]
+
+    return {
+        "test_statistic": test_statistic,
+        "p_value": p_value,
+        "used_lag": used_lag,
+        "n_obs": n_obs,
+        "critical_values": critical_values,
+        "is_stationary": p_value < alpha,
+        "alpha": alpha,
+    }
+
 # ---------------------------------------------------------------------------------------------
 
 def boxcox_transform(
@@ -316,21 +693,25 @@ def boxcox_transform(
     -------
     (serie_transformada, lambda_utilizado)
     """
-    serie_clean = serie.dropna()
+    from scipy import stats
+
+    # array float64 contíguo (o que o scipy espera) e sem cópia extra quando não há NaN
+    values, index = clean_values(serie)
+    values = np.ascontiguousarray(values)
 
-    if (serie_clean <= 0).any():
+    if (values <= 0).any():
         raise ValueError("A transformação Box-Cox requer todos os valores > 0.")
 
     if lmbda is None:
-        transformed_values, fitted_lambda = stats.boxcox(serie_clean.values)
+        transformed_values, fitted_lambda = stats.boxcox(values)
         lmbda_to_use = fitted_lambda
     else:
-        transformed_values = stats.boxcox(serie_clean.values, lmbda=lmbda)
+        transformed_values = stats.boxcox(values, lmbda=lmbda)
         lmbda_to_use = lmbda
 
     transformed = pd.Series(
         data=transformed_values,
-        index=serie_clean.index,
+        index=index,
         name=f"{serie.name}_boxcox" if serie.name else "serie_boxcox",
     )
 
@@ -0,0 +1,12 @@
+import sys
+from pathlib import Path
+
+# os módulos do P01 ficam soltos em src/ (os notebooks também os importam via sys.path)
+P01_SRC = (
+    Path(__file__).resolve().parents[1]
+    / "projects"
+    / "P01-time-series-active-users-forecast"
+    / "src"
+)
+if str(P01_SRC) not in sys.path:
+    sys.path.insert(0, str(P01_SRC))
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import plot_functions as pf
+import pytest
+
+
+def _random_walk() -> pd.Series:
+    rng = np.random.default_rng(0)
+    values = 100 + rng.standard_normal(2000).cumsum()
+    values[[5, 1500, 1501]] = np.nan
+    return pd.Series(values, index=pd.date_range("2020-01-01", periods=len(values)), name="v")
+
+
+def _level_shift() -> pd.Series:
+    # 1000 pontos perto de 1e7 seguidos de 1000 pontos perto de 100 (std ~ 1)
+    rng = np.random.default_rng(1)
+    values = np.concatenate([1e7 + rng.standard_normal(1000), 100 + rng.standard_normal(1000)])
+    return pd.Series(values, index=pd.date_range("2020-01-01", periods=len(values)), name="v")
+
+
+def _exact_rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    return np.array(
+        [
+            np.std(x[i - window + 1 : i + 1], ddof=1) if i >= window - 1 else np.nan
+            for i in range(len(x))
+        ]
+    )
+
+
+@pytest.mark.parametrize("window", [1, 2, 12, 50])
+def test_rolling_kernel_matches_pandas(window):
+    serie = _random_walk()
+    mean, std = pf._rolling_mean_std_kernel(serie.to_numpy(), window)
+
+    np.testing.assert_allclose(mean, serie.rolling(window).mean().to_numpy(), rtol=1e-9)
+    np.testing.assert_allclose(std, serie.rolling(window).std().to_numpy(), rtol=1e-6)
+
+
+def test_rolling_kernel_level_shift_matches_pandas():
+    serie = _level_shift()
+    mean, std = pf._rolling_mean_std_kernel(serie.to_numpy(), 12)
+
+    np.testing.assert_allclose(mean, serie.rolling(12).mean().to_numpy(), rtol=1e-9)
+    np.testing.assert_allclose(std, serie.rolling(12).std().to_numpy(), rtol=1e-6)
+
+
+@pytest.mark.parametrize("window", [2, 12, 50])
+def test_rolling_kernel_level_shift_is_exact(window):
+    # em janelas maiores o próprio pandas acumula erro após a mudança de nível
+    x = _level_shift().to_numpy()
+    _, std = pf._rolling_mean_std_kernel(x, window)
+
+    np.testing.assert_allclose(std, _exact_rolling_std(x, window), rtol=1e-9)
+
+
+def test_rolling_kernel_constant_window_has_zero_std():
+    _, std = pf._rolling_mean_std_kernel(np.array([1e7, 5.0, 3.0, 3.0, 3.0]), 3)
+    assert std[-1] == 0.0
+
+
+@pytest.mark.parametrize("window", [12, 1000])
+def test_rolling_mean_std_matches_pandas(window):
+    serie = _random_walk()
+    mean, std = pf._rolling_mean_std(serie, window)
+
+    pd.testing.assert_series_equal(mean, serie.rolling(window).mean(), rtol=1e-9)
+    pd.testing.assert_series_equal(std, serie.rolling(window).std(), rtol=1e-6)
+
+
+def test_downsample_keeps_non_numeric_series():
+    serie = pd.Series(["a", "b"] * 20_000, dtype="category")
+    assert pf._downsample(serie, max_points=100) is serie
+
+
+@pytest.mark.parametrize("max_points", [100, 101, 999])
+def test_downsample_envelope_keeps_extremes(max_points):
+    serie = _random_walk()
+    reduced = pf._downsample(serie, max_points=max_points)
+
+    assert len(reduced) <= max_points
+    assert reduced.index.is_monotonic_increasing
+    assert reduced.max() == serie.max()
+    assert reduced.min() == serie.min()
+    pd.testing.assert_series_equal(reduced, serie.loc[reduced.index])
+
+
+def test_downsample_keeps_short_series():
+    serie = _random_walk()
+    assert pf._downsample(serie, max_points=len(serie)) is serie
+    assert pf._downsample(serie, max_points=None) is serie
+
+
+@pytest.mark.parametrize("window", [3, 7, 300])
+def test_rolling_kernel_repeated_level_shifts_are_exact(window):
+    # vários saltos de nível: as somas deslizantes são re-ancoradas a cada salto
+    rng = np.random.default_rng(2)
+    levels = np.repeat([1e7, 0.0, -1e5, 1e3], 1000)
+    x = levels + rng.standard_normal(levels.size)
+    _, std = pf._rolling_mean_std_kernel(x, window)
+
+    np.testing.assert_allclose(std, _exact_rolling_std(x, window), rtol=1e-9)
@@ -0,0 +1,294 @@
+import numpy as np
+import pandas as pd
+import pytest
+import utils_timeseries as ut
+
+
+def _with_gaps(n: int = 200) -> pd.Series:
+    # NaNs no início, no meio (em sequência) e no fim
+    rng = np.random.default_rng(0)
+    values = 100 + rng.standard_normal(n).cumsum()
+    values[[0, 1, 10, 50, 51, 52, n - 1]] = np.nan
+    return pd.Series(values, index=pd.date_range("2020-01-01", periods=n), name="v")
+
+
+def _write_csv(path, serie: pd.Series) -> None:
+    frame = pd.DataFrame({"data": serie.index.strftime("%Y-%m-%d"), "usuarios": serie.to_numpy()})
+    frame.to_csv(path, index=False)
+
+
+@pytest.mark.parametrize("use_bottleneck", [True, False])
+@pytest.mark.parametrize("method", ["ffill", "bfill"])
+def test_fill_arr_directional_matches_pandas(monkeypatch, method, use_bottleneck):
+    if not use_bottleneck:
+        monkeypatch.setattr(ut, "bn", None)
+    serie = _with_gaps()
+    expected = serie.ffill() if method == "ffill" else serie.bfill()
+
+    np.testing.assert_array_equal(ut._fill_arr(serie.to_numpy(), method), expected.to_numpy())
+
+
+@pytest.mark.parametrize(
+    "method, value, expected",
+    [
+        ("mean", None, lambda s: s.fillna(s.mean())),
+        ("median", None, lambda s: s.fillna(s.median())),
+        ("zero", None, lambda s: s.fillna(0.0)),
+        ("value", -1.0, lambda s: s.fillna(-1.0)),
+    ],
+)
+def test_fill_missing_matches_pandas(method, value, expected):
+    serie = _with_gaps()
+    pd.testing.assert_series_equal(ut.fill_missing(serie, method, value), expected(serie))
+    np.testing.assert_allclose(
+        ut._fill_arr(serie.to_numpy(), method, value), expected(serie).to_numpy(), rtol=1e-12
+    )
+
+
+def test_fill_arr_does_not_modify_input():
+    x = _with_gaps().to_numpy()
+    before = x.copy()
+    ut._fill_arr(x, "mean")
+    np.testing.assert_array_equal(x, before)
+
+
+def test_fill_arr_rejects_unknown_method():
+    with pytest.raises(ValueError):
+        ut._fill_arr(np.array([1.0, np.nan]), "interpolate")
+
+
+@pytest.mark.parametrize("n", [200, ut._NUMBA_MIN_LEN + 1])
+@pytest.mark.parametrize("order", [0, 1, 2, 3])
+def test_difference_arr_matches_chained_diff(n, order):
+    # n acima de _NUMBA_MIN_LEN passa pelo kernel numba (quando instalado)
+    serie = _with_gaps(n)
+    expected = serie
+    for _ in range(order):
+        expected = expected.diff()
+    x = serie.to_numpy()
+
+    np.testing.assert_allclose(ut._difference_arr(x, order), expected.to_numpy(), rtol=1e-12)
+    np.testing.assert_array_equal(x, serie.to_numpy())
+
+
+@pytest.mark.parametrize("order", [0, 1])
+def test_difference_arr_low_order_skips_numba(monkeypatch, order):
+    # ordem 0/1 fica no caminho NumPy mesmo em séries longas
+    monkeypatch.setattr(ut, "_diff_numba", lambda: pytest.fail("kernel numba usado"))
+    x = _with_gaps(ut._NUMBA_MIN_LEN + 1).to_numpy()
+    ut._difference_arr(x, order)
+
+
+@pytest.mark.parametrize("order", [0, 1, 2, 3])
+def test_difference_series_matches_chained_diff(order):
+    serie = _with_gaps()
+    expected = serie
+    for _ in range(order):
+        expected = expected.diff()
+
+    pd.testing.assert_series_equal(ut.difference_series(serie, order), expected.dropna())
+
+
+def test_difference_series_rejects_negative_order():
+    with pytest.raises(ValueError, match="ordem"):
+        ut.difference_series(_with_gaps(), order=-1)
+
+
+@pytest.mark.parametrize("maxlag", [None, 3])
+def test_adfuller_arr_matches_statsmodels(maxlag):
+    from statsmodels.tsa.stattools import adfuller
+
+    values, _ = ut.clean_values(_with_gaps())
+    if maxlag is None:
+        expected = adfuller(values, autolag="AIC")
+    else:
+        expected = adfuller(values, maxlag=maxlag, autolag=None)
+    result = ut._adfuller_arr(values, maxlag=maxlag)
+
+    assert result["test_statistic"] == pytest.approx(expected[0])
+    assert result["p_value"] == pytest.approx(expected[1])
+    assert result["used_lag"] == expected[2]
+    assert result["n_obs"] == expected[3]
+    assert result["critical_values"] == expected[4]
+
+
+@pytest.mark.parametrize(
+    "date_col, value_col, dtype_backend",
+    [("data", "usuarios", None), (0, 1, None), ("data", "usuarios", "pyarrow")],
+)
+@pytest.mark.parametrize("dropna", [True, False])
+def test_load_timeseries_chunked_matches_full_read(
+    tmp_path, date_col, value_col, dtype_backend, dropna
+):
+    path = tmp_path / "serie.csv"
+    _write_csv(path, _with_gaps())
+    kwargs = {"dtype_backend": dtype_backend, "dropna": dropna}
+
+    full = ut.load_timeseries(path, date_col, value_col, **kwargs)
+    chunked = ut.load_timeseries(path, date_col, value_col, chunksize=7, **kwargs)
+
+    pd.testing.assert_series_equal(chunked, full)
+
+
+def test_load_timeseries_chunked_without_header_matches_full_read(tmp_path):
+    path = tmp_path / "serie.csv"
+    _write_csv(path, _with_gaps())
+    kwargs = {"has_header": False, "column_names": ("data", "usuarios")}
+    # sem cabeçalho, a linha de títulos vira uma data inválida (NaT) nos dois caminhos
+    full = ut.load_timeseries(path, **kwargs)
+    chunked = ut.load_timeseries(path, chunksize=7, **kwargs)
+
+    pd.testing.assert_series_equal(chunked, full)
+
+
+def test_load_timeseries_chunked_applies_dtypes(tmp_path):
+    path = tmp_path / "serie.csv"
+    _write_csv(path, _with_gaps().dropna())
+    kwargs = {"dtypes": {"usuarios": "float32"}}
+
+    full = ut.load_timeseries(path, "data", "usuarios", **kwargs)
+    chunked = ut.load_timeseries(path, "data", "usuarios", chunksize=7, **kwargs)
+
+    assert chunked.dtype == np.float32
+    pd.testing.assert_series_equal(chunked, full)
+
+
+@pytest.mark.parametrize("dtype_backend", [None, "pyarrow"])
+@pytest.mark.parametrize("chunksize", [None, 2])
+def test_load_timeseries_drops_non_numeric_values(tmp_path, dtype_backend, chunksize):
+    path = tmp_path / "serie.csv"
+    path.write_text("data,usuarios\n2020-01-01,1\n2020-01-02,abc\n2020-01-03,3\n")
+
+    serie = ut.load_timeseries(
+        path, "data", "usuarios", chunksize=chunksize, dtype_backend=dtype_backend
+    )
+    raw = ut.load_timeseries(
+        path, "data", "usuarios", chunksize=chunksize, dtype_backend=dtype_backend, dropna=False
+    )
+
+    assert serie.tolist() == [1.0, 3.0]
+    assert raw.isna().tolist() == [False, True, False]
+    assert serie.dtype == ("double[pyarrow]" if dtype_backend else np.float64)
+
+
+@pytest.mark.parametrize(
+    "rows, date_format",
+    [
+        (["2020-01-01 10:00:00", "2020-01-02 11:30:00"], None),
+        (["2020-01-01 10:00:00.5", "2020-01-02 10:00:00.25"], None),
+        (["2020-01-02T00:30:00+02:00", "2020-01-03T00:30:00+02:00"], None),
+        (["01/01/2020", "02/01/2020"], "%d/%m/%Y"),
+    ],
+)
+@pytest.mark.parametrize("dtype_backend", [None, "pyarrow"])
+def test_load_timeseries_dates_match_across_read_paths(tmp_path, rows, date_format, dtype_backend):
+    path = tmp_path / "serie.csv"
+    path.write_text("data,usuarios\n" + "".join(f"{d},{i}\n" for i, d in enumerate(rows)))
+    kwargs = {"date_format": date_format, "dtype_backend": dtype_backend}
+
+    typed = ut.load_timeseries(path, "data", "usuarios", **kwargs)
+    baseline = ut.load_timeseries(path, 0, 1, **kwargs)
+
+    pd.testing.assert_index_equal(typed.index, baseline.index)
+    for other in ({"chunksize": 1}, {"memory_map": True}):
+        pd.testing.assert_series_equal(
+            ut.load_timeseries(path, "data", "usuarios", **other, **kwargs), typed
+        )
+
+
+def test_load_timeseries_keeps_file_utc_offset(tmp_path):
+    path = tmp_path / "serie.csv"
+    path.write_text("data,usuarios\n2020-01-02T00:30:00+02:00,1\n2020-01-03T00:30:00+02:00,2\n")
+
+    serie = ut.load_timeseries(path, "data", "usuarios")
+
+    assert str(serie.index.tz) == "UTC+02:00"
+    assert serie.resample("D").sum().index.day.tolist() == [2, 3]
+
+
+@pytest.mark.parametrize("dtype_backend", [None, "pyarrow", "numpy_nullable"])
+def test_load_timeseries_drops_bad_cell_next_to_missing_values(tmp_path, dtype_backend):
+    # texto inválido e células vazias na mesma coluna
+    path = tmp_path / "serie.csv"
+    path.write_text("data,usuarios\n2020-01-01,1.5\n2020-01-02,\n2020-01-03,abc\n2020-01-04,3\n")
+
+    serie = ut.load_timeseries(path, 0, 1, dtype_backend=dtype_backend)
+
+    assert serie.tolist() == [1.5, 3.0]
+
+
+@pytest.mark.parametrize("date_col, value_col", [("data", "usuarios"), (0, 1)])
+@pytest.mark.parametrize("dtype_backend", [None, "pyarrow"])
+def test_load_timeseries_chunked_coerces_bad_cell_in_one_pass(
+    tmp_path, monkeypatch, date_col, value_col, dtype_backend
+):
+    # célula inválida no último bloco: o arquivo é lido uma única vez
+    serie = _with_gaps().round(0)
+    path = tmp_path / "serie.csv"
+    _write_csv(path, serie)
+    lines = path.read_text().splitlines()
+    lines[-2] = lines[-2].split(",")[0] + ",abc"
+    path.write_text("\n".join(lines) + "\n")
+    kwargs = {"dtype_backend": dtype_backend}
+    full = ut.load_timeseries(path, date_col, value_col, **kwargs)
+
+    calls = []
+    read_csv = pd.read_csv
+    monkeypatch.setattr(pd, "read_csv", lambda *a, **kw: calls.append(kw) or read_csv(*a, **kw))
+    chunked = ut.load_timeseries(path, date_col, value_col, chunksize=7, **kwargs)
+
+    assert len(calls) == 1
+    assert len(chunked) == len(full) == serie.count() - 1
+    pd.testing.assert_series_equal(chunked, full)
+
+
+@pytest.mark.parametrize("dtype_backend", [None, "pyarrow"])
+def test_load_timeseries_memory_map_uses_c_engine(tmp_path, monkeypatch, dtype_backend):
+    path = tmp_path / "serie.csv"
+    _write_csv(path, _with_gaps())
+    default = ut.load_timeseries(path, "data", "usuarios", dtype_backend=dtype_backend)
+
+    calls = []
+    read_csv = pd.read_csv
+    monkeypatch.setattr(pd, "read_csv", lambda *a, **kw: calls.append(kw) or read_csv(*a, **kw))
+    mapped = ut.load_timeseries(
+        path, "data", "usuarios", dtype_backend=dtype_backend, memory_map=True
+    )
+
+    # a engine pyarrow não aceita memory_map: a leitura tipada usa a engine padrão
+    assert len(calls) == 1
+    assert calls[0]["memory_map"] is True
+    assert "engine" not in calls[0]
+    pd.testing.assert_series_equal(mapped, default)
+
+
+@pytest.mark.parametrize("col", [2, -3, "outra"])
+def test_resolve_col_rejects_missing_column(col):
+    with pytest.raises(KeyError):
+        ut._resolve_col(pd.Index(["data", "usuarios"]), col)
+
+
+def test_fill_missing_promotes_only_numeric_object_series():
+    numeric = ut.fill_missing(pd.Series([1.0, None, "3"], dtype=object), "ffill")
+    mixed = ut.fill_missing(pd.Series(["a", None, 1], dtype=object), "ffill")
+
+    assert numeric.dtype == np.float64
+    assert numeric.tolist() == [1.0, 1.0, 3.0]
+    # texto não numérico: a série fica como object, sem perder valores
+    assert mixed.dtype == object
+    assert mixed.tolist() == ["a", "a", 1]
+
+
+def test_adfuller_test_with_maxlag_uses_fixed_lag():
+    from statsmodels.tsa.stattools import adfuller
+
+    serie = _with_gaps()
+    values = serie.dropna().to_numpy()
+    expected = adfuller(values, maxlag=4, autolag=None)
+
+    result = ut.adfuller_test(serie, maxlag=4)
+
+    assert result["used_lag"] == 4
+    assert result["test_statistic"] == pytest.approx(expected[0])
+    assert result["p_value"] == pytest.approx(expected[1])
+    assert result["is_stationary"] == (expected[1] < 0.05)